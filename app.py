@@ -1,18 +1,50 @@
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 from data_processor import DataProcessor
 from nav_fetcher import NavFetcher
+from tsdownsample import LTTBDownsampler
 import os
+import hashlib
+import datetime
+import shutil
 
 st.set_page_config(page_title="MF SIP Tracker", layout="wide")
 
 @st.cache_data
-def load_data(file_path):
-    processor = DataProcessor(file_path)
+def load_data(file_key, _file_source):
+    # _file_source is not hashed; file_key identifies its contents
+    processor = DataProcessor(_file_source)
     df = processor.load_data()
     return processor, df
 
+@st.cache_data
+def get_active_schemes(_processor, file_key, today, days=45):
+    # _processor is not hashed; file_key identifies the loaded file and
+    # today invalidates the result once the 45-day window moves
+    return _processor.get_active_schemes(days)
+
+@st.cache_resource(ttl=24*60*60)
+def get_fetcher():
+    # ttl matches the scheme list's disk cache so new AMFI schemes are picked up
+    return NavFetcher()
+
+def downsample_nav(nav_data, n_out=2000):
+    # LTTB keeps the visual shape of the line (incl. first/last points) with far fewer points
+    if len(nav_data) <= n_out:
+        return nav_data
+    x = nav_data['date'].to_numpy().view('int64')
+    y = nav_data['nav'].to_numpy()
+    idx = LTTBDownsampler().downsample(x, y, n_out=n_out)
+    return nav_data.iloc[idx]
+
+def get_file_key(file_source):
+    if isinstance(file_source, str):
+        return (file_source, os.path.getmtime(file_source))
+    # Hash uploaded bytes so the key is stable across reruns that re-yield the same file
+    return hashlib.blake2b(file_source.getbuffer(), digest_size=16).hexdigest()
+
 def main():
     st.title("Mutual Fund SIP Tracker")
     
@@ -28,8 +60,9 @@ def main():
         file_source = uploaded_file
         # Option to save as default
         if st.sidebar.button("Set as Default"):
+            uploaded_file.seek(0)
             with open(DEFAULT_FILE, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+                shutil.copyfileobj(uploaded_file, f, length=1024*1024)
             st.sidebar.success("File saved as default!")
     elif os.path.exists(DEFAULT_FILE):
         st.sidebar.info("Using default cached file.")
@@ -44,29 +77,21 @@ def main():
             st.warning("Please upload a CAS Excel file to proceed.")
             return
 
-    processor, df = load_data(file_source)
+    file_key = get_file_key(file_source)
+    processor, df = load_data(file_key, file_source)
     
     if df is None:
         st.error("Failed to load data.")
         return
 
     # Initialize NAV Fetcher
-    fetcher = NavFetcher()
+    fetcher = get_fetcher()
     
     # Scheme Selection Logic
     schemes = processor.get_schemes()
     
-    # Filter for Active SIPs (funds with transactions in last 45 days)
-    # We need to check transactions for each scheme
-    active_schemes = []
-    cutoff_date = datetime.datetime.now() - pd.Timedelta(days=45)
-    
-    for s in schemes:
-        trans = processor.get_transactions_for_scheme(s)
-        # Check for PURCHASES (Amount > 0) in the last 45 days
-        recent_purchases = trans[(trans['Date'] >= cutoff_date) & (trans['Amount'] > 0)]
-        if not recent_purchases.empty:
-            active_schemes.append(s)
+    # Filter for Active SIPs (funds with purchases in last 45 days)
+    active_schemes = get_active_schemes(processor, file_key, datetime.date.today())
             
     use_active_only = st.sidebar.checkbox("Show Only Active SIPs", value=True)
     
@@ -110,10 +135,10 @@ def main():
         selected_range = st.radio("Select Time Range", list(time_ranges.keys()), index=1, horizontal=True)
         
         # Filter NAV data based on selection
-        end_date = datetime.datetime.now()
+        end_date = np.datetime64(datetime.date.today()) # Local date; np.datetime64('today') is UTC
         
         if time_ranges[selected_range]:
-            start_date = end_date - pd.Timedelta(days=time_ranges[selected_range])
+            start_date = end_date - np.timedelta64(time_ranges[selected_range], 'D')
         else:
             # All Time: Start from the beginning of available NAV data or transactions
             start_date = nav_data['date'].min()
@@ -124,29 +149,33 @@ def main():
         # Actually, for "All Time" we want everything. For specific ranges, we strictly respect the range 
         # BUT if a transaction happened in that range, we show it.
         
-        mask = (nav_data['date'] >= start_date) & (nav_data['date'] <= end_date)
-        filtered_nav = nav_data.loc[mask]
+        # nav_data is sorted by date and ends at the latest NAV, so only the start needs a binary search
+        nav_dates = nav_data['date'].to_numpy()
+        start_idx = np.searchsorted(nav_dates, pd.Timestamp(start_date).to_datetime64(), side='left')
+        filtered_nav = nav_data.iloc[start_idx:]
         
         # Plotting
         fig = go.Figure()
         
-        # NAV Line
-        fig.add_trace(go.Scatter(
-            x=filtered_nav['date'], 
-            y=filtered_nav['nav'],
+        # NAV Line (WebGL; purchases below stay SVG for their hover text)
+        plot_nav = downsample_nav(filtered_nav)
+        fig.add_trace(go.Scattergl(
+            x=plot_nav['date'], 
+            y=plot_nav['nav'],
             mode='lines',
             name='NAV',
-            line=dict(color='blue', width=2)
+            line=dict(color='blue', width=2),
+            hoverinfo='x+y' # Plain axis values only; rich hover is on the purchase markers
         ))
         
         # Process Transactions for Plotting
         if not transactions.empty:
-            # Aggregate by Date
-            agg_trans = transactions.groupby('Date').agg({
-                'Amount': 'sum',
-                'Units': 'sum',
-                'NAV': 'mean' # NAV should be same for same day usually
-            }).reset_index()
+            # Aggregate by Date (transactions are already date-sorted, so skip the groupby sort)
+            agg_trans = transactions.groupby('Date', sort=False, as_index=False).agg(
+                Amount=('Amount', 'sum'),
+                Units=('Units', 'sum'),
+                NAV=('NAV', 'mean') # NAV should be same for same day usually
+            )
             
             # Filter for purchases (Amount > 0)
             purchases = agg_trans[agg_trans['Amount'] > 0]
@@ -162,9 +191,17 @@ def main():
                 if max_amt == min_amt:
                     purchases['size'] = 12
                 else:
-                    purchases['size'] = purchases['Amount'].apply(
-                        lambda x: min_size + (x - min_amt) * (max_size - min_size) / (max_amt - min_amt)
-                    )
+                    amt = purchases['Amount'].to_numpy()
+                    purchases['size'] = min_size + (amt - min_amt) * (max_size - min_size) / (max_amt - min_amt)
+
+                # Build hover text from plain arrays rather than a row-wise apply
+                dates = purchases['Date'].dt.strftime('%Y-%m-%d').to_numpy()
+                amounts = purchases['Amount'].to_numpy()
+                units = purchases['Units'].to_numpy()
+                hover_text = [
+                    f"Date: {d}<br>Total Amount: ₹{a:,.2f}<br>Total Units: {u:.2f}"
+                    for d, a, u in zip(dates, amounts, units)
+                ]
 
                 fig.add_trace(go.Scatter(
                     x=purchases['Date'],
@@ -177,7 +214,7 @@ def main():
                         symbol='circle',
                         line=dict(color='white', width=1)
                     ),
-                    text=purchases.apply(lambda row: f"Date: {row['Date'].date()}<br>Total Amount: ₹{row['Amount']:,.2f}<br>Total Units: {row['Units']:.2f}", axis=1),
+                    text=hover_text,
                     hoverinfo='text'
                 ))
         
@@ -203,9 +240,8 @@ def main():
         st.dataframe(transactions)
         
         # Summary Metrics
-        total_invested = transactions['Amount'].sum()
-        total_units = transactions['Units'].sum()
-        latest_nav = filtered_nav.iloc[-1]['nav']
+        total_invested, total_units = transactions[['Amount', 'Units']].to_numpy().sum(axis=0)
+        latest_nav = filtered_nav['nav'].iat[-1]
         current_value = total_units * latest_nav
         profit = current_value - total_invested
         
@@ -217,6 +253,5 @@ def main():
     st.markdown("---")
     st.markdown("<div style='text-align: center; color: grey;'>Made By Atharva</div>", unsafe_allow_html=True)
 
-import datetime
 if __name__ == "__main__":
     main()
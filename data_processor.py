@@ -1,13 +1,12 @@
 import pandas as pd
-import warnings
-
-# Suppress openpyxl warnings
-warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
+import numpy as np
+import datetime
 
 class DataProcessor:
     def __init__(self, file_path):
         self.file_path = file_path
         self.transactions = None
+        self._scheme_rows = {}
 
     def load_data(self):
         """
@@ -15,11 +14,18 @@ class DataProcessor:
         Assumes the 'Transaction Details' sheet exists and header is at row 8 (0-indexed).
         """
         try:
-            # Read the specific sheet with header at row 8
-            df = pd.read_excel(self.file_path, sheet_name='Transaction Details', header=8)
-            
-            # Filter for relevant columns
             required_cols = ['Scheme Name', 'Date', 'NAV', 'Units', 'Amount', 'Transaction Description']
+            
+            # Read the specific sheet with header at row 8. calamine still reads the whole sheet;
+            # usecols only drops the unused columns before the DataFrame is built
+            df = pd.read_excel(
+                self.file_path,
+                sheet_name='Transaction Details',
+                header=8,
+                engine='calamine',
+                usecols=lambda c: str(c).strip() in required_cols
+            )
+            
             # Map columns if names are slightly different (e.g. extra spaces)
             col_map = {c: c.strip() for c in df.columns}
             df.rename(columns=col_map, inplace=True)
@@ -43,6 +49,15 @@ class DataProcessor:
             # Filter out zero amount transactions if they are not relevant (e.g. stamp duty lines often have small amounts, but 0 might be reversals)
             # Keeping all for now, but user might want to filter.
             
+            # Categorical scheme names make filtering compare int codes instead of strings;
+            # categories keep the order schemes appear in the CAS
+            df['Scheme Name'] = pd.Categorical(df['Scheme Name'], categories=df['Scheme Name'].unique())
+            
+            # Sort once and keep each scheme's row positions; a dict of small int arrays
+            # survives the st.cache_data pickle round-trip, unlike per-scheme frames
+            df = df.sort_values('Date', kind='stable')
+            self._scheme_rows = df.groupby('Scheme Name', sort=False, observed=True).indices
+            
             self.transactions = df
             return df
             
@@ -53,14 +68,25 @@ class DataProcessor:
     def get_schemes(self):
         """Returns a list of unique scheme names found in the transactions."""
         if self.transactions is not None:
-            return self.transactions['Scheme Name'].unique().tolist()
+            return self.transactions['Scheme Name'].cat.categories.tolist()
         return []
 
     def get_transactions_for_scheme(self, scheme_name):
-        """Returns transactions for a specific scheme."""
-        if self.transactions is not None:
-            return self.transactions[self.transactions['Scheme Name'] == scheme_name].sort_values('Date')
-        return pd.DataFrame()
+        """Returns transactions for a specific scheme, sorted by date."""
+        if self.transactions is None:
+            return pd.DataFrame()
+        return self.transactions.iloc[self._scheme_rows.get(scheme_name, [])]
+
+    def get_active_schemes(self, days=45):
+        """Returns schemes with a purchase (Amount > 0) in the last `days` days."""
+        if self.transactions is None:
+            return []
+        # Local date, matching NavFetcher's cache freshness (np.datetime64('today') is UTC)
+        cutoff_date = np.datetime64(datetime.date.today()) - np.timedelta64(days, 'D')
+        mask = (self.transactions['Date'] >= cutoff_date) & (self.transactions['Amount'] > 0)
+        # Same order as get_schemes()
+        active = self.transactions.loc[mask, 'Scheme Name'].cat.remove_unused_categories()
+        return active.cat.categories.tolist()
 
 if __name__ == "__main__":
     # Test run
@@ -1,5 +1,9 @@
 import pandas as pd
 import os
+import warnings
+
+# Suppress openpyxl warnings
+warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
 
 file_path = '/Users/nbt3157/Personal/MF_management/cas_detailed_report_2026_01_20_151931.xlsx'
 
@@ -1,19 +1,50 @@
 from mftool import Mftool
-from fuzzywuzzy import process
+from rapidfuzz import process, fuzz, utils
 import pandas as pd
 import datetime
 import json
 import os
+import threading
 
 class NavFetcher:
     def __init__(self):
         self.mf = Mftool()
-        self.scheme_codes = self.mf.get_scheme_codes() # Returns a dict {code: name}
+        self.scheme_codes_file = 'scheme_codes_cache.json'
+        self.load_scheme_codes() # Sets self.scheme_codes, a dict {code: name}
         self.scheme_names = list(self.scheme_codes.values())
-        self.cache_file = 'nav_cache.json'
+        # Reverse lookup; built in reverse so the first code wins for duplicate names
+        self._name_to_code = {name: code for code, name in reversed(list(self.scheme_codes.items()))}
+        self.cache_dir = 'nav_cache'
+        # Today's NAV frames by scheme code, skips the parquet read on repeat selections
+        self.nav_memo = {}
+        self.nav_memo_date = None
+        self.nav_memo_size = 64
         self.mapping_file = 'scheme_mapping.json'
+        # One instance is shared by every Streamlit session thread (st.cache_resource)
+        self._lock = threading.Lock()
         self.load_mappings()
-        self.load_cache()
+
+    def load_scheme_codes(self):
+        """
+        Loads the AMFI scheme list from disk if it was saved within 24 hours,
+        otherwise fetches it from AMFI and saves it.
+        """
+        if os.path.exists(self.scheme_codes_file):
+            age = datetime.datetime.now().timestamp() - os.path.getmtime(self.scheme_codes_file)
+            if age < 24 * 60 * 60:
+                try:
+                    with open(self.scheme_codes_file, 'r') as f:
+                        self.scheme_codes = json.load(f)
+                    return
+                except:
+                    pass
+
+        self.scheme_codes = self.mf.get_scheme_codes()
+        try:
+            with open(self.scheme_codes_file, 'w') as f:
+                json.dump(self.scheme_codes, f)
+        except Exception as e:
+            print(f"Error saving scheme codes cache: {e}")
 
     def load_mappings(self):
         if os.path.exists(self.mapping_file):
@@ -26,19 +57,25 @@ class NavFetcher:
         with open(self.mapping_file, 'w') as f:
             json.dump(self.mappings, f, indent=4)
 
-    def load_cache(self):
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r') as f:
-                    self.cache = json.load(f)
-            except:
-                self.cache = {}
-        else:
-            self.cache = {}
+    def get_cache_path(self, scheme_code):
+        return os.path.join(self.cache_dir, f"{scheme_code}.parquet")
+
+    def load_cache(self, scheme_code):
+        """Returns the cached NAV DataFrame for a scheme if it was written today, else None."""
+        path = self.get_cache_path(scheme_code)
+        if os.path.exists(path):
+            # The file's mtime is its last_updated date
+            last_updated = datetime.date.fromtimestamp(os.path.getmtime(path))
+            if last_updated == datetime.date.today():
+                try:
+                    return pd.read_parquet(path)
+                except:
+                    return None
+        return None
 
-    def save_cache(self):
-        with open(self.cache_file, 'w') as f:
-            json.dump(self.cache, f, indent=4)
+    def save_cache(self, scheme_code, df):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        df.to_parquet(self.get_cache_path(scheme_code), compression='zstd', index=False)
 
     def get_scheme_code(self, scheme_name):
         """
@@ -49,40 +86,57 @@ class NavFetcher:
 
         # Fuzzy match
         # We look for the best match in the AMFI list
-        best_match, score = process.extractOne(scheme_name, self.scheme_names)
+        # score_cutoff is the threshold for automatic acceptance; returns None below it.
+        # default_process lowercases and strips punctuation, as fuzzywuzzy did
+        result = process.extractOne(
+            scheme_name,
+            self.scheme_names,
+            scorer=fuzz.WRatio,
+            processor=utils.default_process,
+            score_cutoff=80
+        )
         
-        if score > 80: # Threshold for automatic acceptance
-            # Find the code for this name
-            for code, name in self.scheme_codes.items():
-                if name == best_match:
-                    self.mappings[scheme_name] = code
-                    self.save_mappings()
-                    return code
+        if result is not None:
+            code = self._name_to_code[result[0]]
+            with self._lock:
+                self.mappings[scheme_name] = code
+                self.save_mappings()
+            return code
         
-        print(f"Warning: Low match score ({score}) for '{scheme_name}'. Best match: '{best_match}'")
+        print(f"Warning: No match scoring 80 or higher for '{scheme_name}'")
         return None
 
+    def memoize_nav(self, scheme_code, df):
+        with self._lock:
+            if len(self.nav_memo) >= self.nav_memo_size:
+                # Evict the oldest entry (dicts keep insertion order)
+                self.nav_memo.pop(next(iter(self.nav_memo)), None)
+            self.nav_memo[scheme_code] = df
+
     def fetch_historical_nav(self, scheme_code):
         """
         Fetches historical NAV for a given scheme code.
-        Checks cache first. Cache is valid for 24 hours.
+        Checks cache first. Cache is valid for the day it was written.
+        The returned DataFrame is shared between callers and must not be modified in place.
         """
         if not scheme_code:
             return None
             
-        # Check Cache
-        today_str = datetime.date.today().isoformat()
-        
-        if scheme_code in self.cache:
-            last_updated = self.cache[scheme_code].get('last_updated')
-            # If updated today, return cached data
-            if last_updated == today_str:
-                data = self.cache[scheme_code]['data']
-                df = pd.DataFrame(data)
-                df['date'] = pd.to_datetime(df['date']) # Format is already ISO in JSON usually or we need to check
-                # When saving to JSON, dates become strings. 
-                # Let's standardize on saving as list of dicts with ISO date strings
-                return df
+        # Check in-memory cache, then disk cache
+        today = datetime.date.today()
+        with self._lock:
+            if self.nav_memo_date != today:
+                # Entries from earlier days are stale
+                self.nav_memo = {}
+                self.nav_memo_date = today
+            df = self.nav_memo.get(scheme_code)
+        if df is not None:
+            return df
+
+        df = self.load_cache(scheme_code)
+        if df is not None:
+            self.memoize_nav(scheme_code, df)
+            return df
 
         try:
             data = self.mf.get_scheme_historical_nav(scheme_code)
@@ -96,15 +150,8 @@ class NavFetcher:
                 df = df.sort_values('date')
                 
                 # Update Cache
-                # Convert date back to string for JSON serialization
-                cache_data = df.copy()
-                cache_data['date'] = cache_data['date'].dt.strftime('%Y-%m-%d')
-                
-                self.cache[scheme_code] = {
-                    'last_updated': today_str,
-                    'data': cache_data.to_dict('records')
-                }
-                self.save_cache()
+                self.save_cache(scheme_code, df)
+                self.memoize_nav(scheme_code, df)
                 
                 return df
         except Exception as e: